@@ -0,0 +1,88 @@
+"""Generation throughput benchmark comparing speculative decoding modes.
+
+Run with ``python -m app.bench [--model PATH] [--modes none prompt_lookup]``.
+"""
+
+from __future__ import annotations
+
+import argparse
+import time
+from typing import Sequence
+
+from langchain_core.language_models import BaseLanguageModel
+
+from app.config import settings
+from app.llm import SPECULATIVE_MODES, load_llm
+
+DEFAULT_PROMPT = (
+    "Answer the question using only the context.\n\n"
+    "Context: The backup drive at /media/archive holds family videos from "
+    "2015 to 2021, sorted into one folder per year. Photos are stored "
+    "separately under /media/photos and are synced nightly from each phone.\n\n"
+    "Question: Where are the family videos from 2018 stored?\n"
+    "Answer:"
+)
+
+
+def count_tokens(llm: BaseLanguageModel, text: str) -> int:
+    """Count ``text`` in the model's own tokens where the tokenizer is known."""
+    client = getattr(llm, "client", None)
+    if hasattr(client, "tokenize"):
+        return len(client.tokenize(text.encode("utf-8"), add_bos=False))
+    gen_pipeline = getattr(llm, "pipeline", None)
+    if gen_pipeline is not None:
+        return len(gen_pipeline.tokenizer.encode(text, add_special_tokens=False))
+    return llm.get_num_tokens(text)
+
+
+def tokens_per_second(
+    llm: BaseLanguageModel, prompt: str = DEFAULT_PROMPT, runs: int = 3
+) -> float:
+    """Return mean generated tokens per second over ``runs`` invocations."""
+    # Transformers pipelines echo the prompt unless told otherwise.
+    kwargs = {"skip_prompt": True} if getattr(llm, "pipeline", None) else {}
+    llm.invoke(prompt, **kwargs)  # warm up caches and lazy initialisation
+    tokens = 0
+    elapsed = 0.0
+    for _ in range(runs):
+        start = time.perf_counter()
+        out = llm.invoke(prompt, **kwargs)
+        elapsed += time.perf_counter() - start
+        text = str(getattr(out, "content", out))
+        if text.startswith(prompt):
+            text = text[len(prompt) :]
+        tokens += count_tokens(llm, text)
+    return tokens / elapsed if elapsed else 0.0
+
+
+def compare_speculative(
+    model_name: str | None = None,
+    modes: Sequence[str] = ("none", "prompt_lookup"),
+    prompt: str = DEFAULT_PROMPT,
+    runs: int = 3,
+) -> dict[str, float]:
+    """Benchmark ``model_name`` once per speculative mode."""
+    return {
+        mode: tokens_per_second(load_llm(model_name, speculative=mode), prompt, runs)
+        for mode in modes
+    }
+
+
+def main(argv: Sequence[str] | None = None) -> None:
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument("--model", default=settings.llm_model_name)
+    parser.add_argument(
+        "--modes", nargs="+", choices=SPECULATIVE_MODES, default=["none", "prompt_lookup"]
+    )
+    parser.add_argument("--runs", type=int, default=3)
+    args = parser.parse_args(argv)
+
+    results = compare_speculative(args.model, args.modes, runs=args.runs)
+    baseline = results.get("none")
+    for mode, tps in results.items():
+        speedup = f" ({tps / baseline:.2f}x)" if baseline else ""
+        print(f"{mode:>14}: {tps:8.2f} tokens/s{speedup}")
+
+
+if __name__ == "__main__":
+    main()
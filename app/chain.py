@@ -4,15 +4,18 @@ from __future__ import annotations
 
 from langchain.chains import RetrievalQAWithSourcesChain
 from langchain_core.language_models import BaseChatModel
+from langchain_core.retrievers import BaseRetriever
 
 from app.database import get_parent_retriever
 from app.llm import load_llm
 
 
-def build_qa_chain(model: BaseChatModel | None = None) -> RetrievalQAWithSourcesChain:
+def build_qa_chain(
+    model: BaseChatModel | None = None, retriever: BaseRetriever | None = None
+) -> RetrievalQAWithSourcesChain:
     """Return a `RetrievalQAWithSourcesChain` configured for the app."""
     llm = model or load_llm()
-    retriever = get_parent_retriever()
+    retriever = retriever or get_parent_retriever()
     return RetrievalQAWithSourcesChain.from_chain_type(
         llm, retriever=retriever, return_source_documents=True
     )
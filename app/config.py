@@ -3,12 +3,33 @@ from pydantic_settings import BaseSettings
 
 class Settings(BaseSettings):
     llm_model_name: str = "mistralai/Mistral-7B-v0.1"
+    extract_model_name: str | None = None
+    llm_memory_budget_mb: int = 16384
     embed_model_name: str = "sentence-transformers/all-MiniLM-L6-v2"
     meili_url: str = "http://localhost:7700"
     meili_api_key: str | None = None
     files_index: str = "files"
     file_chunks_index: str = "file_chunks"
     files_domain: str = "http://localhost"
+    rerank_model_name: str | None = None
+    rerank_fetch_k: int = 20
+    rerank_top_k: int = 3
+    rerank_batch_size: int = 32
+    rerank_backend: str = "torch"
+    rerank_model_file: str | None = None
+    speculative_mode: str = "none"
+    draft_model_name: str | None = None
+    draft_num_pred_tokens: int = 10
+    llama_n_threads: int | None = None
+    llama_n_threads_batch: int | None = None
+    llama_n_batch: int | None = None
+    llama_n_ctx: int = 8192
+    llama_n_gpu_layers: int = -1
+    llama_use_mmap: bool = True
+    llama_use_mlock: bool = False
+    llama_kv_cache_type: str = "f16"
+    llama_auto_tune: bool = False
+    llama_calibrate: bool = False
 
 
 settings = Settings()
@@ -6,12 +6,14 @@ from meilisearch import Client
 from langchain_community.vectorstores import Meilisearch as MeiliVector
 from langchain_community.embeddings import HuggingFaceEmbeddings
 from langchain.retrievers import ParentDocumentRetriever
+from langchain.retrievers.multi_vector import SearchType
 from langchain_core.stores import BaseStore
 
 from app.config import settings
+from app.rerank import CrossEncoderReranker, get_reranker
 from langchain_core.documents import Document
 from langchain_core.retrievers import BaseRetriever
-from pydantic import ConfigDict
+from pydantic import ConfigDict, model_validator
 from urllib.parse import urljoin
 from datetime import datetime, UTC
 
@@ -23,13 +25,49 @@ class MeiliDocStore(BaseStore[str, Document]):
 
     def __init__(self, client: Client, index_name: str) -> None:
         self.index = client.index(index_name)
+        self._primary_key: str | None = None
+
+    def _get_primary_key(self) -> str:
+        if self._primary_key is None:
+            self._primary_key = self.index.get_primary_key() or "id"
+        return self._primary_key
+
+    def _fetch_many(self, keys: Sequence[str]) -> dict[str, dict]:
+        """Fetch ``keys`` with a single documents request, keyed by id."""
+        try:
+            primary_key = self._get_primary_key()
+            result = self.index.get_documents(
+                {"ids": ",".join(keys), "limit": len(keys)}
+            )
+        except Exception:
+            return {}
+        found: dict[str, dict] = {}
+        for doc in result.results:
+            data = dict(doc)
+            key = data.get(primary_key)
+            if key is not None:
+                found[str(key)] = data
+        return found
+
+    def _fetch_one(self, key: str) -> dict | None:
+        try:
+            return dict(self.index.get_document(key))
+        except Exception:
+            return None
 
     def mget(self, keys: Sequence[str]) -> list[Optional[Document]]:
+        """Return documents for ``keys`` using one bulk fetch.
+
+        Keys the bulk request did not return (e.g. on Meilisearch versions
+        without ``ids`` support) are fetched individually.
+        """
+        found = self._fetch_many(keys) if keys else {}
         docs: list[Optional[Document]] = []
         for key in keys:
-            try:
-                data = self.index.get_document(key)
-            except Exception:
+            data = found.get(str(key))
+            if data is None:
+                data = self._fetch_one(key)
+            if data is None:
                 docs.append(None)
                 continue
             docs.append(Document(page_content=data.get("content", ""), metadata=data))
@@ -62,6 +100,43 @@ def search_index(index_name: str, query: str, limit: int = 5, **params) -> list[
     return result.get("hits", [])
 
 
+def search_index_batch(
+    index_name: str,
+    queries: Sequence[str],
+    limit: int = 5,
+    vectors: Sequence[list[float]] | None = None,
+    **params,
+) -> list[list[dict]]:
+    """Run several Meilisearch queries in one multi-search request.
+
+    ``vectors`` optionally provides a query embedding per entry in
+    ``queries``. Hits are returned per query, in the order given.
+    """
+    if not queries:
+        return []
+    client = get_meili_client()
+    requests = []
+    for i, query in enumerate(queries):
+        request = {"indexUid": index_name, "q": query, "limit": limit, **params}
+        if vectors is not None:
+            request["vector"] = vectors[i]
+        requests.append(request)
+    result = client.multi_search(requests)
+    return [r.get("hits", []) for r in result.get("results", [])]
+
+
+def _needs_runnable_batch(config, return_exceptions: bool) -> bool:
+    """Return whether ``batch`` must defer to ``Runnable.batch``.
+
+    The bulk paths answer all inputs with one request, so they cannot
+    report per-input exceptions or fire per-input callbacks.
+    """
+    if return_exceptions:
+        return True
+    configs = config if isinstance(config, list) else [config]
+    return any(c and c.get("callbacks") for c in configs)
+
+
 class MetadataRetriever(BaseRetriever):
     """Simple retriever that performs a MeiliSearch text query."""
 
@@ -69,6 +144,132 @@ class MetadataRetriever(BaseRetriever):
         hits = search_index(settings.files_index, query, limit=4)
         return [Document(page_content=h.get("content", ""), metadata=h) for h in hits]
 
+    def batch(
+        self, inputs: list[str], config=None, *, return_exceptions: bool = False, **kwargs
+    ) -> list[list[Document]]:
+        """Search all ``inputs`` with a single multi-search request."""
+        if _needs_runnable_batch(config, return_exceptions):
+            return super().batch(
+                inputs, config, return_exceptions=return_exceptions, **kwargs
+            )
+        results = search_index_batch(settings.files_index, inputs, limit=4)
+        return [
+            [Document(page_content=h.get("content", ""), metadata=h) for h in hits]
+            for hits in results
+        ]
+
+
+class BatchParentDocumentRetriever(ParentDocumentRetriever):
+    """``ParentDocumentRetriever`` with optional reranking and a bulk path.
+
+    With a ``reranker`` set, ``rerank_fetch_k`` chunks are fetched, rescored
+    by the cross-encoder and only the top ``rerank_top_k`` parents are kept.
+    ``batch`` embeds every query in one forward pass, searches the chunk
+    index with one multi-search request and resolves all parents with a
+    single docstore fetch.
+    """
+
+    chunks_index: str
+    # HuggingFaceEmbeddings encodes queries exactly like documents, so one
+    # embed_documents call matches what embed_query does per query.
+    embeddings: HuggingFaceEmbeddings
+    embedder_name: str = "default"
+    reranker: Optional[CrossEncoderReranker] = None
+    rerank_fetch_k: int = 20
+    rerank_top_k: int = 3
+
+    model_config = ConfigDict(arbitrary_types_allowed=True)
+
+    @model_validator(mode="after")
+    def _check_rerank_search_type(self):
+        if self.reranker is not None and self.search_type != SearchType.similarity:
+            raise ValueError("Reranking requires search_type='similarity'")
+        return self
+
+    def _parent_ids(self, chunk_metadata: Sequence[dict]) -> list[str]:
+        ids: list[str] = []
+        for meta in chunk_metadata:
+            parent_id = meta.get(self.id_key)
+            if parent_id is not None and parent_id not in ids:
+                ids.append(parent_id)
+        if self.reranker is not None:
+            ids = ids[: self.rerank_top_k]
+        return ids
+
+    def _get_relevant_documents(self, query: str, *, run_manager=None):
+        if self.reranker is None:
+            return super()._get_relevant_documents(query, run_manager=run_manager)
+        search_kwargs = {**self.search_kwargs, "k": self.rerank_fetch_k}
+        chunks = self.vectorstore.similarity_search(query, **search_kwargs)
+        order = self.reranker.rank(query, [c.page_content for c in chunks])
+        ids = self._parent_ids([chunks[i].metadata for i in order])
+        docs = self.docstore.mget(ids)
+        return [d for d in docs if d is not None]
+
+    def _search_chunks(self, queries: list[str]) -> list[list[dict]]:
+        vectors = self.embeddings.embed_documents(queries)
+        params = dict(self.search_kwargs)
+        limit = params.pop("k", 4)
+        if self.reranker is not None:
+            limit = self.rerank_fetch_k
+        # An empty query text with a semantic ratio of 1.0 mirrors the
+        # request the vectorstore issues for a single query.
+        return search_index_batch(
+            self.chunks_index,
+            [""] * len(queries),
+            limit=limit,
+            vectors=vectors,
+            hybrid={"semanticRatio": 1.0, "embedder": self.embedder_name},
+            **params,
+        )
+
+    def _rerank_hits(
+        self, queries: list[str], hits_per_query: list[list[dict]]
+    ) -> list[list[dict]]:
+        """Rescore the hits of every query with a single batched model call."""
+        pairs = [
+            (query, hit.get("metadata", hit).get("text", ""))
+            for query, hits in zip(queries, hits_per_query)
+            for hit in hits
+        ]
+        scores = self.reranker.score(pairs)
+        ranked = []
+        offset = 0
+        for hits in hits_per_query:
+            order = self.reranker.order(scores[offset : offset + len(hits)])
+            offset += len(hits)
+            ranked.append([hits[i] for i in order])
+        return ranked
+
+    def batch(
+        self, inputs: list[str], config=None, *, return_exceptions: bool = False, **kwargs
+    ) -> list[list[Document]]:
+        if (
+            _needs_runnable_batch(config, return_exceptions)
+            or self.search_type != SearchType.similarity
+        ):
+            return super().batch(
+                inputs, config, return_exceptions=return_exceptions, **kwargs
+            )
+        if not inputs:
+            return []
+        hits_per_query = self._search_chunks(inputs)
+        if self.reranker is not None:
+            hits_per_query = self._rerank_hits(inputs, hits_per_query)
+        per_query_ids = [
+            self._parent_ids([hit.get("metadata", hit) for hit in hits])
+            for hits in hits_per_query
+        ]
+
+        all_ids = list(dict.fromkeys(i for ids in per_query_ids for i in ids))
+        parents = dict(zip(all_ids, self.docstore.mget(all_ids)))
+        results = []
+        for ids in per_query_ids:
+            docs = [parents[i] for i in ids if parents[i] is not None]
+            # Each query gets its own copies since callers mutate metadata.
+            results.append([d.model_copy(deep=True) for d in docs])
+        return results
+
 
 class CanonicalURLRetriever(BaseRetriever):
     """Wrap a retriever and normalise file metadata for the LLM."""
@@ -82,7 +283,24 @@ class CanonicalURLRetriever(BaseRetriever):
         super().__init__(wrapped=wrapped, base_url=base_url.rstrip("/"))
 
     def _get_relevant_documents(self, query: str, run_manager=None):
-        docs = self.wrapped.invoke(query)
+        return self._canonicalise(self.wrapped.invoke(query))
+
+    def batch(
+        self, inputs: list[str], config=None, *, return_exceptions: bool = False, **kwargs
+    ) -> list[list[Document]]:
+        """Batch the wrapped retriever and normalise each result list."""
+        if _needs_runnable_batch(config, False):
+            return super().batch(
+                inputs, config, return_exceptions=return_exceptions, **kwargs
+            )
+        results = self.wrapped.batch(
+            inputs, config, return_exceptions=return_exceptions, **kwargs
+        )
+        return [
+            r if isinstance(r, Exception) else self._canonicalise(r) for r in results
+        ]
+
+    def _canonicalise(self, docs: list[Document]) -> list[Document]:
         for d in docs:
             paths_map = d.metadata.get("paths")
             if isinstance(paths_map, dict):
@@ -138,9 +356,14 @@ def get_parent_retriever():
         api_key=settings.meili_api_key,
     )
     meta_store = MeiliDocStore(get_meili_client(), settings.files_index)
-    parent = ParentDocumentRetriever(
+    parent = BatchParentDocumentRetriever(
         vectorstore=chunks_vs,
         docstore=meta_store,
         id_key="file_id",
+        chunks_index=settings.file_chunks_index,
+        embeddings=embeddings,
+        reranker=get_reranker(),
+        rerank_fetch_k=settings.rerank_fetch_k,
+        rerank_top_k=settings.rerank_top_k,
     )
     return CanonicalURLRetriever(parent, base_url=settings.files_domain)
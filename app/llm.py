@@ -1,5 +1,11 @@
 from __future__ import annotations
 
+import json
+import math
+import os
+from concurrent.futures import Future
+from glob import glob
+
 from transformers import AutoModelForCausalLM, AutoTokenizer, pipeline
 from langchain_community.llms import HuggingFacePipeline
 from langchain_community.chat_models import ChatLlamaCpp
@@ -7,49 +13,168 @@ from langchain_core.language_models import BaseChatModel
 from langchain_core.language_models.fake import FakeListLLM
 
 from app.config import settings
+from app.registry import ModelRegistry
+from app.tuning import kv_cache_mb, llama_cpp_params
+
+SPECULATIVE_MODES = ("none", "prompt_lookup", "draft_model")
+
+
+def _llama_cpp_kwargs(speculative: str) -> dict:
+    """Return extra ``llama_cpp.Llama`` arguments for speculative decoding."""
+    if speculative == "none":
+        return {}
+    if speculative == "draft_model":
+        raise ValueError(
+            "llama.cpp models only support 'prompt_lookup' speculative decoding"
+        )
+    from llama_cpp.llama_speculative import LlamaPromptLookupDecoding
+
+    return {
+        "draft_model": LlamaPromptLookupDecoding(
+            num_pred_tokens=settings.draft_num_pred_tokens
+        )
+    }
+
+
+def _generate_kwargs(speculative: str) -> dict:
+    """Return ``generate`` arguments enabling assisted generation."""
+    if speculative == "none":
+        return {}
+    if speculative == "prompt_lookup":
+        return {"prompt_lookup_num_tokens": settings.draft_num_pred_tokens}
+    if not settings.draft_model_name:
+        raise ValueError("draft_model_name is required for 'draft_model' decoding")
+    assistant = AutoModelForCausalLM.from_pretrained(
+        settings.draft_model_name,
+        use_safetensors=True,
+    )
+    return {"assistant_model": assistant}
+
+
+def _build_llm(key: tuple[str, str]) -> BaseChatModel:
+    """Instantiate the model for a ``(model_name, speculative)`` key."""
+    model_name, speculative = key
+    if model_name.endswith(".gguf"):
+        params = llama_cpp_params(model_name)
+        params["model_kwargs"].update(_llama_cpp_kwargs(speculative))
+        return ChatLlamaCpp(model_path=model_name, temperature=0.0, **params)
+    if model_name.startswith("sshleifer/"):
+        return FakeListLLM(responses=["test"])
+
+    tokenizer = AutoTokenizer.from_pretrained(model_name)
+    model = AutoModelForCausalLM.from_pretrained(
+        model_name,
+        use_safetensors=True,
+    )
+    gen_pipeline = pipeline(
+        "text-generation",
+        model=model,
+        tokenizer=tokenizer,
+        max_new_tokens=256,
+        **_generate_kwargs(speculative),
+    )
+    return HuggingFacePipeline(pipeline=gen_pipeline)
+
+
+def _checkpoint_mb(model_name: str) -> float | None:
+    """Estimate a transformers checkpoint's size once loaded, without loading it.
+
+    Parameters are counted from safetensors headers, locally or on the Hub.
+    ``None`` means the size could not be determined.
+    """
+    try:
+        if os.path.isdir(model_name):
+            params = 0
+            for path in glob(os.path.join(model_name, "*.safetensors")):
+                with open(path, "rb") as f:
+                    header_len = int.from_bytes(f.read(8), "little")
+                    header = json.loads(f.read(header_len))
+                params += sum(
+                    math.prod(info["shape"])
+                    for name, info in header.items()
+                    if name != "__metadata__"
+                )
+        else:
+            from huggingface_hub import get_safetensors_metadata
+
+            params = sum(get_safetensors_metadata(model_name).parameter_count.values())
+    except Exception:
+        return None
+    # from_pretrained loads weights as float32 unless a dtype is requested.
+    return params * 4 / 2**20 if params else None
 
-_cached_llm = None
-_cached_model_name: str | None = None
 
+def _model_size_mb(key: tuple[str, str], llm: BaseChatModel | None) -> float | None:
+    """Estimate the resident size of a model in MB.
 
-def load_llm(model_name: str | None = None) -> BaseChatModel:
+    ``.gguf`` models are sized from the file on disk plus the KV cache for
+    their context. Transformers models are sized from their checkpoints
+    before loading and measured once loaded. ``None`` means unknown.
+    """
+    model_name, speculative = key
+    if model_name.endswith(".gguf"):
+        try:
+            weights = os.path.getsize(model_name) / 2**20
+        except OSError:
+            return 0.0
+        if llm is None:
+            # Auto-tuning only ever shrinks the context, so this is an upper bound.
+            n_ctx, metadata = settings.llama_n_ctx, None
+        else:
+            n_ctx, metadata = llm.n_ctx, getattr(llm.client, "metadata", None)
+        kv = kv_cache_mb(model_name, n_ctx, settings.llama_kv_cache_type, metadata)
+        return weights + kv
+    if model_name.startswith("sshleifer/"):
+        return 0.0
+    if llm is None:
+        size = _checkpoint_mb(model_name)
+        if size is not None and speculative == "draft_model" and settings.draft_model_name:
+            draft = _checkpoint_mb(settings.draft_model_name)
+            size = None if draft is None else size + draft
+        return size
+    gen_pipeline = getattr(llm, "pipeline", None)
+    if gen_pipeline is not None:
+        size = gen_pipeline.model.get_memory_footprint()
+        assistant = getattr(gen_pipeline, "assistant_model", None)
+        if assistant is not None:
+            size += assistant.get_memory_footprint()
+        return size / 2**20
+    return 0.0
+
+
+registry = ModelRegistry(_build_llm, _model_size_mb, settings.llm_memory_budget_mb)
+
+
+def _registry_key(model_name: str | None, speculative: str | None) -> tuple[str, str]:
+    model_name = model_name or settings.llm_model_name
+    speculative = speculative or settings.speculative_mode
+    if speculative not in SPECULATIVE_MODES:
+        raise ValueError(f"Unknown speculative mode: {speculative}")
+    return model_name, speculative
+
+
+def load_llm(
+    model_name: str | None = None, speculative: str | None = None
+) -> BaseChatModel:
     """Load a language model for chat completions.
 
     If ``model_name`` ends with ``.gguf`` it is loaded using ``ChatLlamaCpp``.
     Otherwise a small HuggingFace model is loaded via ``transformers`` for
     compatibility with the tests.
-    """
-    global _cached_llm, _cached_model_name
-    model_name = model_name or settings.llm_model_name
 
-    if _cached_llm is not None and model_name == _cached_model_name:
-        return _cached_llm
+    ``speculative`` selects ``"none"``, ``"prompt_lookup"`` or
+    ``"draft_model"`` decoding and defaults to ``settings.speculative_mode``.
+    Prompt lookup drafts tokens from the prompt itself, which suits RAG
+    answers that quote the retrieved context.
+
+    Loaded models are kept in ``registry``; the least recently used ones are
+    evicted once ``settings.llm_memory_budget_mb`` is exceeded.
+    """
+    return registry.get(_registry_key(model_name, speculative))
 
-    if model_name.endswith(".gguf"):
-        llm = ChatLlamaCpp(
-            model_path=model_name,
-            n_gpu_layers=-1,
-            n_ctx=8192,
-            n_batch=512,
-            f16_kv=True,
-            temperature=0.0,
-        )
-    elif model_name.startswith("sshleifer/"):
-        llm = FakeListLLM(responses=["test"])
-    else:
-        tokenizer = AutoTokenizer.from_pretrained(model_name)
-        model = AutoModelForCausalLM.from_pretrained(
-            model_name,
-            use_safetensors=True,
-        )
-        gen_pipeline = pipeline(
-            "text-generation",
-            model=model,
-            tokenizer=tokenizer,
-            max_new_tokens=256,
-        )
-        llm = HuggingFacePipeline(pipeline=gen_pipeline)
 
-    _cached_llm = llm
-    _cached_model_name = model_name
-    return llm
+def preload_llm(
+    model_name: str | None = None, speculative: str | None = None
+) -> Future:
+    """Start loading a model in the background and return its future."""
+    return registry.load_async(_registry_key(model_name, speculative))
@@ -1,18 +1,47 @@
 import streamlit as st
+from concurrent.futures import Future
 from urllib.parse import urljoin
 
 from langchain_core.documents import Document
 
 from app.config import settings
-from app.llm import load_llm
+from app.database import get_parent_retriever
+from app.llm import load_llm, preload_llm, registry
 from app.chain import build_qa_chain
 
 
 @st.cache_resource(show_spinner=False)
+def get_retriever():
+    """Return the shared parent document retriever."""
+    return get_parent_retriever()
+
+
 def get_chain(model_name: str):
-    """Load model and return a QA chain."""
+    """Load model and return a QA chain.
+
+    The model comes from the LLM registry, which bounds memory use, so the
+    chain itself is rebuilt cheaply instead of being cached.
+    """
     llm = load_llm(model_name)
-    return build_qa_chain(llm)
+    return build_qa_chain(llm, retriever=get_retriever())
+
+
+def track_load(future: Future) -> dict:
+    """Return a status dict that is updated when ``future`` completes.
+
+    Only the status is kept: holding the future would keep the model alive
+    after the registry evicts it.
+    """
+    status = {"state": "loading", "error": None}
+
+    def _done(f: Future) -> None:
+        error = f.exception()
+        status["state"] = "failed" if error is not None else "loaded"
+        status["error"] = str(error) if error is not None else None
+
+    future.add_done_callback(_done)
+    return status
+
 
 def render_source(doc: Document, *, base_download_dir: str = "/downloads/") -> None:
     """Render a document source in Streamlit."""
@@ -48,11 +77,30 @@ def main():
     )
 
     if st.sidebar.button("Load model"):
-        st.session_state["chain"] = get_chain(model_name)
-        st.success(f"Loaded model {model_name}")
+        st.session_state["model_name"] = model_name
+        st.session_state["model_status"] = track_load(preload_llm(model_name))
+
+    status = st.session_state.get("model_status")
+    if status is not None:
+        loading_name = st.session_state.get("model_name")
+        if status["state"] == "loading":
+            st.sidebar.info(f"Loading model {loading_name}")
+        elif status["state"] == "failed":
+            st.sidebar.error(f"Failed to load {loading_name}: {status['error']}")
+        else:
+            st.sidebar.success(f"Loaded model {loading_name}")
+
+    resident = registry.resident()
+    if resident:
+        st.sidebar.caption(
+            "Resident models: "
+            + ", ".join(f"{name} ({size:.0f} MB)" for (name, _), size in resident.items())
+        )
 
-    chain = st.session_state.get("chain")
-    if query and chain:
+    loaded_name = st.session_state.get("model_name")
+    if query and loaded_name:
+        with st.spinner("Loading model..."):
+            chain = get_chain(loaded_name)
         result = chain.invoke({"question": query})
         answer = result.get("answer", "") if isinstance(result, dict) else str(result)
         docs = result.get("source_documents", []) if isinstance(result, dict) else []
@@ -154,7 +154,7 @@ PROMPT = ChatPromptTemplate.from_messages(
 
 def query_pipeline(query: str):
     """Generate a structured query from text and search Meilisearch."""
-    llm = load_llm(settings.llm_model_name)
+    llm = load_llm(settings.extract_model_name or settings.llm_model_name)
     parser = JsonOutputParser(pydantic_object=FileDocument)
     chain = PROMPT | llm | parser
     result = chain.invoke({"query": query})
@@ -0,0 +1,102 @@
+"""LRU registry keeping several loaded models under a memory budget."""
+
+from __future__ import annotations
+
+import gc
+import threading
+from collections import OrderedDict
+from concurrent.futures import Future, ThreadPoolExecutor
+from typing import Any, Callable, Hashable
+
+
+class ModelRegistry:
+    """Hold loaded models and evict the least recently used ones.
+
+    ``loader(key)`` builds a model and ``sizer(key, model)`` returns its
+    resident size in MB. ``sizer`` is also called with ``model=None`` before
+    loading so that room can be made up front; if it returns ``None`` the
+    size is unknown and every other model is evicted first. Loads run on a single background thread, so at most one model is
+    being materialised at a time.
+    """
+
+    def __init__(
+        self,
+        loader: Callable[[Hashable], Any],
+        sizer: Callable[[Hashable, Any], float | None],
+        memory_budget_mb: float,
+    ) -> None:
+        self.loader = loader
+        self.sizer = sizer
+        self.memory_budget_mb = memory_budget_mb
+        self._models: OrderedDict[Hashable, tuple[Any, float]] = OrderedDict()
+        self._pending: dict[Hashable, Future] = {}
+        self._lock = threading.Lock()
+        self._executor = ThreadPoolExecutor(max_workers=1, thread_name_prefix="model-load")
+
+    def get(self, key: Hashable) -> Any:
+        """Return the model for ``key``, loading it if necessary."""
+        return self.load_async(key).result()
+
+    def load_async(self, key: Hashable) -> Future:
+        """Start loading ``key`` in the background and return a future."""
+        with self._lock:
+            if key in self._models:
+                self._models.move_to_end(key)
+                future: Future = Future()
+                future.set_result(self._models[key][0])
+                return future
+            if key not in self._pending:
+                self._pending[key] = self._executor.submit(self._load, key)
+            return self._pending[key]
+
+    def _load(self, key: Hashable) -> Any:
+        try:
+            incoming = self.sizer(key, None)
+            with self._lock:
+                self._evict_to_fit(float("inf") if incoming is None else incoming)
+            model = self.loader(key)
+            size = self.sizer(key, model)
+            with self._lock:
+                self._models[key] = (model, size)
+                self._evict_to_fit(0, keep=key)
+            return model
+        finally:
+            with self._lock:
+                self._pending.pop(key, None)
+
+    def _evict_to_fit(self, incoming_mb: float, keep: Hashable | None = None) -> None:
+        evicted = False
+        for key in list(self._models):
+            if self._total_mb() + incoming_mb <= self.memory_budget_mb:
+                break
+            if key == keep:
+                continue
+            del self._models[key]
+            evicted = True
+        if evicted:
+            gc.collect()
+
+    def _total_mb(self) -> float:
+        return sum(size for _, size in self._models.values())
+
+    def evict(self, key: Hashable) -> None:
+        """Drop ``key`` from the registry if it is loaded."""
+        with self._lock:
+            if self._models.pop(key, None) is not None:
+                gc.collect()
+
+    def clear(self) -> None:
+        """Drop every loaded model."""
+        with self._lock:
+            self._models.clear()
+        gc.collect()
+
+    def resident(self) -> dict[Hashable, float]:
+        """Return the resident size in MB of each loaded model, LRU first."""
+        with self._lock:
+            return {key: size for key, (_, size) in self._models.items()}
+
+    def resident_mb(self) -> float:
+        """Return the total resident size in MB of all loaded models."""
+        with self._lock:
+            return self._total_mb()
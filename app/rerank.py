@@ -0,0 +1,102 @@
+"""Cross-encoder reranking of retrieved chunks."""
+
+from __future__ import annotations
+
+import importlib.util
+from typing import Sequence
+
+from app.config import settings
+
+BACKENDS = ("torch", "onnx", "openvino")
+
+_reranker = None
+
+
+class CrossEncoderReranker:
+    """Score ``(query, passage)`` pairs with a small cross-encoder.
+
+    The model is loaded on first use. ``backend="onnx"`` together with
+    ``model_file`` (e.g. ``onnx/model_qint8_avx512.onnx``) selects a
+    quantised ONNX export for faster CPU inference; it needs the
+    ``sentence-transformers[onnx]`` extra.
+    """
+
+    def __init__(
+        self,
+        model_name: str,
+        *,
+        batch_size: int = 32,
+        backend: str = "torch",
+        model_file: str | None = None,
+    ) -> None:
+        if backend not in BACKENDS:
+            raise ValueError(f"Unknown rerank backend: {backend}")
+        if backend != "torch" and importlib.util.find_spec("optimum") is None:
+            raise ImportError(
+                f"The {backend} rerank backend requires "
+                f"'pip install sentence-transformers[{backend}]'"
+            )
+        self.model_name = model_name
+        self.batch_size = batch_size
+        self.backend = backend
+        self.model_file = model_file
+        self._model = None
+
+    def _load(self):
+        if self._model is None:
+            from sentence_transformers import CrossEncoder
+
+            kwargs: dict = {"device": "cpu"}
+            if self.backend != "torch":
+                kwargs["backend"] = self.backend
+            if self.model_file:
+                kwargs["model_kwargs"] = {"file_name": self.model_file}
+            self._model = CrossEncoder(self.model_name, **kwargs)
+        return self._model
+
+    def score(self, pairs: Sequence[tuple[str, str]]) -> list[float]:
+        """Return a relevance score for each ``(query, passage)`` pair."""
+        if not pairs:
+            return []
+        model = self._load()
+        scores = model.predict(
+            [list(p) for p in pairs],
+            batch_size=self.batch_size,
+            show_progress_bar=False,
+        )
+        return [float(s) for s in scores]
+
+    def rank(self, query: str, passages: Sequence[str]) -> list[int]:
+        """Return indexes of ``passages`` ordered from most to least relevant."""
+        return self.order(self.score([(query, p) for p in passages]))
+
+    @staticmethod
+    def order(scores: Sequence[float]) -> list[int]:
+        """Return indexes of ``scores`` from highest to lowest, ties in order."""
+        return sorted(range(len(scores)), key=lambda i: scores[i], reverse=True)
+
+
+def get_reranker() -> CrossEncoderReranker | None:
+    """Return the configured reranker or ``None`` when reranking is disabled."""
+    global _reranker
+    if not settings.rerank_model_name:
+        return None
+    config = (
+        settings.rerank_model_name,
+        settings.rerank_batch_size,
+        settings.rerank_backend,
+        settings.rerank_model_file,
+    )
+    if _reranker is None or (
+        _reranker.model_name,
+        _reranker.batch_size,
+        _reranker.backend,
+        _reranker.model_file,
+    ) != config:
+        _reranker = CrossEncoderReranker(
+            settings.rerank_model_name,
+            batch_size=settings.rerank_batch_size,
+            backend=settings.rerank_backend,
+            model_file=settings.rerank_model_file,
+        )
+    return _reranker
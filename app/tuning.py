@@ -0,0 +1,335 @@
+"""Runtime tuning of llama.cpp parameters for the host machine."""
+
+from __future__ import annotations
+
+import math
+import os
+import time
+from typing import Sequence
+
+from app.config import settings
+
+KV_CACHE_TYPES = {
+    # name: (GGML type id, bytes per element)
+    "f16": (1, 2.0),
+    "q8_0": (8, 34 / 32),
+    "q4_0": (2, 18 / 32),
+}
+
+CALIBRATION_PASSAGE = (
+    "[{i}] /media/archive/{year}/clip_{i:03d}.mp4 (video/mp4, modified "
+    "{year}-06-{day:02d}): Recording of the family trip to the lake house. "
+    "The transcript mentions the drive north, the storm on the second night "
+    "and dinner with the neighbours before the ferry back.\n"
+)
+CALIBRATION_QUESTION = "Question: Which clips were recorded at the lake house?\nAnswer:"
+
+DEFAULT_N_BATCH = 512
+CALIBRATION_BATCH_OPTIONS = (128, 256, 512)
+
+_calibrated: dict[tuple, tuple[int, int, int]] = {}
+_metadata: dict[str, dict] = {}
+
+
+def _cpu_topology() -> dict[int, tuple[str | None, str]]:
+    """Map logical CPU ids to ``(physical id, core id)`` from /proc/cpuinfo."""
+    topology: dict[int, tuple[str | None, str]] = {}
+    try:
+        with open("/proc/cpuinfo") as f:
+            processor = physical = core = None
+            for line in f:
+                key, _, value = line.partition(":")
+                key = key.strip()
+                if key == "processor":
+                    processor = int(value)
+                elif key == "physical id":
+                    physical = value.strip()
+                elif key == "core id":
+                    core = value.strip()
+                elif not key:
+                    if processor is not None and core is not None:
+                        topology[processor] = (physical, core)
+                    processor = physical = core = None
+            if processor is not None and core is not None:
+                topology[processor] = (physical, core)
+    except (OSError, ValueError):
+        return {}
+    return topology
+
+
+def _cgroup_cpu_limit() -> int | None:
+    """Return the CPU quota of this process's cgroup in whole CPUs, if any."""
+    try:
+        with open("/sys/fs/cgroup/cpu.max") as f:
+            quota, period = f.read().split()[:2]
+        if quota != "max":
+            return max(math.ceil(int(quota) / int(period)), 1)
+        return None
+    except (OSError, ValueError):
+        pass
+    try:
+        with open("/sys/fs/cgroup/cpu/cpu.cfs_quota_us") as f:
+            quota = int(f.read())
+        with open("/sys/fs/cgroup/cpu/cpu.cfs_period_us") as f:
+            period = int(f.read())
+        if quota > 0 and period > 0:
+            return max(math.ceil(quota / period), 1)
+    except (OSError, ValueError):
+        pass
+    return None
+
+
+def detect_physical_cores() -> int:
+    """Return the number of physical CPU cores this process can use.
+
+    Only cores with a logical CPU in the affinity mask are counted, and the
+    result is capped by the cgroup CPU quota (e.g. ``docker --cpus``).
+    """
+    if hasattr(os, "sched_getaffinity"):
+        cpus = os.sched_getaffinity(0)
+    else:
+        cpus = set(range(os.cpu_count() or 1))
+    topology = _cpu_topology()
+    if topology:
+        cores = len({topology[c] for c in cpus if c in topology}) or len(cpus)
+    else:
+        try:
+            import psutil
+
+            physical = psutil.cpu_count(logical=False)
+            logical = psutil.cpu_count()
+        except ImportError:
+            physical = logical = None
+        if physical and logical:
+            cores = len(cpus) * physical // logical
+        else:
+            cores = len(cpus)
+    limit = _cgroup_cpu_limit()
+    if limit is not None:
+        cores = min(cores, limit)
+    return max(cores, 1)
+
+
+def available_memory_mb() -> float | None:
+    """Return memory available for new allocations in MB, if known."""
+    try:
+        import psutil
+
+        return psutil.virtual_memory().available / 2**20
+    except ImportError:
+        pass
+    try:
+        with open("/proc/meminfo") as f:
+            for line in f:
+                if line.startswith("MemAvailable:"):
+                    return int(line.split()[1]) / 1024
+    except OSError:
+        pass
+    return None
+
+
+def kv_cache_mb_per_token(metadata: dict, kv_cache_type: str) -> float:
+    """Estimate the KV cache size per context token from GGUF metadata."""
+    arch = metadata.get("general.architecture", "llama")
+    n_layer = int(metadata[f"{arch}.block_count"])
+    n_embd = int(metadata[f"{arch}.embedding_length"])
+    n_head = int(metadata[f"{arch}.attention.head_count"])
+    n_head_kv = int(metadata.get(f"{arch}.attention.head_count_kv", n_head))
+    _, elem_bytes = KV_CACHE_TYPES[kv_cache_type]
+    return 2 * n_layer * n_embd * n_head_kv / n_head * elem_bytes / 2**20
+
+
+def gguf_metadata(model_path: str) -> dict:
+    """Read GGUF metadata without loading the model weights."""
+    if model_path not in _metadata:
+        from llama_cpp import Llama
+
+        llm = Llama(model_path=model_path, vocab_only=True, verbose=False)
+        _metadata[model_path] = dict(llm.metadata)
+    return _metadata[model_path]
+
+
+def kv_cache_mb(
+    model_path: str, n_ctx: int, kv_cache_type: str, metadata: dict | None = None
+) -> float:
+    """Estimate the KV cache size in MB, or ``0.0`` if it cannot be read."""
+    try:
+        meta = metadata if metadata is not None else gguf_metadata(model_path)
+        return n_ctx * kv_cache_mb_per_token(meta, kv_cache_type)
+    except Exception:
+        return 0.0
+
+
+def _fit_context(model_path: str, n_ctx: int, kv_cache_type: str) -> int:
+    """Halve ``n_ctx`` until weights and KV cache fit in available memory."""
+    available = available_memory_mb()
+    if available is None:
+        return n_ctx
+    per_token = kv_cache_mb(model_path, 1, kv_cache_type)
+    if not per_token:
+        return n_ctx
+    budget = available - os.path.getsize(model_path) / 2**20
+    while n_ctx > 512 and n_ctx * per_token > budget:
+        n_ctx //= 2
+    return n_ctx
+
+
+def calibration_prompt(tokenize, min_tokens: int) -> str:
+    """Build a stuffed-context RAG prompt of more than ``min_tokens`` tokens."""
+    passages = []
+    prompt = CALIBRATION_QUESTION
+    while len(tokenize(prompt)) <= min_tokens:
+        i = len(passages)
+        passages.append(CALIBRATION_PASSAGE.format(i=i, year=2010 + i % 12, day=1 + i % 28))
+        prompt = "Context:\n" + "".join(passages) + CALIBRATION_QUESTION
+    return prompt
+
+
+def _time_phases(llm, tokens: list[int], max_tokens: int) -> tuple[float, float]:
+    """Return seconds spent on prompt evaluation and on generation."""
+    llm.reset()
+    start = time.perf_counter()
+    llm.eval(tokens)
+    prompt_s = time.perf_counter() - start
+    start = time.perf_counter()
+    for _ in range(max_tokens):
+        llm.eval([llm.sample(temp=0.0)])
+    return prompt_s, time.perf_counter() - start
+
+
+def calibrate(
+    model_path: str,
+    thread_options: Sequence[int] | None = None,
+    batch_thread_options: Sequence[int] | None = None,
+    batch_options: Sequence[int] = CALIBRATION_BATCH_OPTIONS,
+    max_tokens: int = 16,
+) -> tuple[int, int, int]:
+    """Benchmark this host and return the fastest
+    ``(n_threads, n_threads_batch, n_batch)``.
+
+    The prompt is a stuffed-context RAG prompt longer than the largest
+    batch option. Prompt evaluation and generation are timed separately:
+    ``n_threads`` is judged on generation, ``n_threads_batch`` and
+    ``n_batch`` on prompt evaluation. Thread candidates default to
+    fractions of :func:`detect_physical_cores`. Results are cached per
+    model path and options for the lifetime of the process.
+    """
+    cores = detect_physical_cores()
+    default_threads = sorted({max(cores // 2, 1), max(cores * 3 // 4, 1), cores})
+    thread_options = list(thread_options or default_threads)
+    batch_thread_options = list(batch_thread_options or default_threads)
+    batch_options = list(batch_options)
+    key = (
+        model_path,
+        tuple(thread_options),
+        tuple(batch_thread_options),
+        tuple(batch_options),
+    )
+    if key in _calibrated:
+        return _calibrated[key]
+    from llama_cpp import Llama
+
+    vocab = Llama(model_path=model_path, vocab_only=True, verbose=False)
+    prompt = calibration_prompt(
+        lambda text: vocab.tokenize(text.encode("utf-8")), max(batch_options)
+    )
+    tokens = vocab.tokenize(prompt.encode("utf-8"))
+    del vocab
+    n_ctx = len(tokens) + max_tokens + 16
+
+    def run(n_threads: int, n_threads_batch: int, n_batch: int) -> tuple[float, float]:
+        llm = Llama(
+            model_path=model_path,
+            n_ctx=n_ctx,
+            n_batch=n_batch,
+            n_threads=n_threads,
+            n_threads_batch=n_threads_batch,
+            n_gpu_layers=settings.llama_n_gpu_layers,
+            verbose=False,
+        )
+        _time_phases(llm, tokens[:8], 1)  # warm up
+        timings = _time_phases(llm, tokens, max_tokens)
+        del llm
+        return timings
+
+    n_threads, n_threads_batch = thread_options[0], batch_thread_options[0]
+    if len(thread_options) > 1 or len(batch_thread_options) > 1:
+        gen_times: dict[int, float] = {}
+        prompt_times: dict[int, float] = {}
+        # Each phase only uses its own thread count, so one run per
+        # candidate measures both.
+        for threads in sorted(set(thread_options) | set(batch_thread_options)):
+            prompt_s, gen_s = run(threads, threads, max(batch_options))
+            if threads in thread_options:
+                gen_times[threads] = gen_s
+            if threads in batch_thread_options:
+                prompt_times[threads] = prompt_s
+        n_threads = min(gen_times, key=gen_times.get)
+        n_threads_batch = min(prompt_times, key=prompt_times.get)
+
+    n_batch = batch_options[0]
+    if len(batch_options) > 1:
+        batch_times = {
+            batch: run(n_threads, n_threads_batch, batch)[0] for batch in batch_options
+        }
+        n_batch = min(batch_times, key=batch_times.get)
+
+    _calibrated[key] = (n_threads, n_threads_batch, n_batch)
+    return _calibrated[key]
+
+
+def llama_cpp_params(model_path: str) -> dict:
+    """Return ``ChatLlamaCpp`` runtime arguments for ``model_path``.
+
+    Explicit settings are used as given. With ``llama_auto_tune`` the
+    context size is reduced to fit available memory and an unset thread
+    count defaults to the usable physical cores; ``llama_calibrate``
+    instead benchmarks whichever of the thread counts and batch size are
+    unset. An unset ``n_threads_batch`` follows ``n_threads`` so prompt
+    processing does not fall back to every logical CPU.
+    """
+    if settings.llama_kv_cache_type not in KV_CACHE_TYPES:
+        raise ValueError(f"Unknown KV cache type: {settings.llama_kv_cache_type}")
+
+    n_threads = settings.llama_n_threads
+    n_threads_batch = settings.llama_n_threads_batch
+    n_batch = settings.llama_n_batch
+    n_ctx = settings.llama_n_ctx
+    if settings.llama_auto_tune:
+        n_ctx = _fit_context(model_path, n_ctx, settings.llama_kv_cache_type)
+        if settings.llama_calibrate and None in (n_threads, n_threads_batch, n_batch):
+            n_threads, n_threads_batch, n_batch = calibrate(
+                model_path,
+                thread_options=None if n_threads is None else [n_threads],
+                batch_thread_options=(
+                    None if n_threads_batch is None else [n_threads_batch]
+                ),
+                batch_options=(
+                    CALIBRATION_BATCH_OPTIONS if n_batch is None else [n_batch]
+                ),
+            )
+        if n_threads is None:
+            n_threads = detect_physical_cores()
+    if n_threads_batch is None:
+        n_threads_batch = n_threads
+    if n_batch is None:
+        n_batch = DEFAULT_N_BATCH
+
+    kv_type, _ = KV_CACHE_TYPES[settings.llama_kv_cache_type]
+    model_kwargs: dict = {}
+    if settings.llama_kv_cache_type != "f16":
+        # llama.cpp needs flash attention for a quantised V cache.
+        model_kwargs = {"type_k": kv_type, "type_v": kv_type, "flash_attn": True}
+    if n_threads_batch is not None:
+        model_kwargs["n_threads_batch"] = n_threads_batch
+
+    return {
+        "n_threads": n_threads,
+        "n_batch": n_batch,
+        "n_ctx": n_ctx,
+        "n_gpu_layers": settings.llama_n_gpu_layers,
+        "use_mmap": settings.llama_use_mmap,
+        "use_mlock": settings.llama_use_mlock,
+        "f16_kv": settings.llama_kv_cache_type == "f16",
+        "model_kwargs": model_kwargs,
+    }
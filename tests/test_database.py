@@ -8,8 +8,12 @@ from app.database import (
     get_meta_retriever,
     CanonicalURLRetriever,
 )
+from app.rerank import CrossEncoderReranker
 from langchain_core.documents import Document
+from langchain_community.embeddings import HuggingFaceEmbeddings
 from langchain_core.retrievers import BaseRetriever
+from langchain_core.stores import BaseStore
+from langchain_core.vectorstores import VectorStore
 
 
 def test_get_meili_client_instance():
@@ -39,3 +43,264 @@ def test_canonical_retriever():
     assert docs[0].metadata["url"].endswith("b.txt")
     assert docs[0].metadata["paths"][0].startswith("https://domain")
     assert isinstance(docs[0].metadata["mtime"], str)
+
+
+def test_search_index_batch(monkeypatch):
+    import app.database as db_module
+
+    captured = {}
+
+    class DummyClient:
+        def multi_search(self, queries):
+            captured["queries"] = queries
+            return {"results": [{"hits": [{"q": q["q"]}]} for q in queries]}
+
+    monkeypatch.setattr(db_module, "_client", DummyClient(), raising=False)
+    results = db_module.search_index_batch("files", ["a", "b"], limit=2)
+
+    assert [r[0]["q"] for r in results] == ["a", "b"]
+    assert len(captured["queries"]) == 2
+    assert captured["queries"][0] == {"indexUid": "files", "q": "a", "limit": 2}
+
+
+def test_docstore_mget_bulk():
+    from app.database import MeiliDocStore
+
+    calls = []
+
+    class DummyResults:
+        results = [{"id": "1", "content": "one"}, {"id": "2", "content": "two"}]
+
+    class DummyIndex:
+        def get_primary_key(self):
+            return "id"
+
+        def get_documents(self, params):
+            calls.append(params)
+            return DummyResults()
+
+        def get_document(self, key):
+            raise KeyError(key)
+
+    class DummyClient:
+        def index(self, name):
+            return DummyIndex()
+
+    store = MeiliDocStore(DummyClient(), "files")
+    docs = store.mget(["2", "3", "1"])
+
+    assert len(calls) == 1
+    assert docs[0].page_content == "two"
+    assert docs[1] is None
+    assert docs[2].page_content == "one"
+
+
+class BatchDummyRetriever(DummyRetriever):
+    def batch(self, inputs, config=None, **kwargs):
+        return [self._get_relevant_documents(q) for q in inputs]
+
+
+def test_canonical_retriever_batch():
+    wrapper = CanonicalURLRetriever(BatchDummyRetriever(), base_url="https://domain")
+    results = wrapper.batch(["q1", "q2"])
+    assert len(results) == 2
+    assert all(r[0].metadata["url"].endswith("b.txt") for r in results)
+
+
+EMBED_CALLS = []
+
+
+class StubEmbeddings(HuggingFaceEmbeddings):
+    def embed_documents(self, texts):
+        EMBED_CALLS.append(list(texts))
+        return [[float(len(t))] for t in texts]
+
+
+class StubVectorStore(VectorStore):
+    def add_texts(self, texts, metadatas=None, **kwargs):
+        raise NotImplementedError
+
+    chunks: list = []
+
+    def similarity_search(self, query, k=4, **kwargs):
+        self.k = k
+        return self.chunks[:k]
+
+    @classmethod
+    def from_texts(cls, texts, embedding, metadatas=None, **kwargs):
+        raise NotImplementedError
+
+
+class StubDocStore(BaseStore):
+    def __init__(self, docs):
+        self.docs = docs
+        self.calls = []
+
+    def mget(self, keys):
+        self.calls.append(list(keys))
+        return [self.docs.get(k) for k in keys]
+
+    def mset(self, key_value_pairs):
+        raise NotImplementedError
+
+    def mdelete(self, keys):
+        raise NotImplementedError
+
+    def yield_keys(self, prefix=None):
+        raise NotImplementedError
+
+
+def chunk_hit(file_id, text=""):
+    return {"metadata": {"file_id": file_id, "text": text}}
+
+
+def make_parent_retriever(monkeypatch, hits, **kwargs):
+    import app.database as db_module
+    from app.database import BatchParentDocumentRetriever
+    from langchain_text_splitters import CharacterTextSplitter
+
+    captured = {}
+
+    class DummyClient:
+        def multi_search(self, queries):
+            captured["queries"] = queries
+            return {"results": [{"hits": h} for h in list(hits.values())[: len(queries)]]}
+
+    monkeypatch.setattr(db_module, "_client", DummyClient(), raising=False)
+    EMBED_CALLS.clear()
+    docstore = StubDocStore(
+        {
+            i: Document(page_content=i, metadata={"id": i})
+            for i in ("f1", "f2", "f3", "f4")
+        }
+    )
+    retriever = BatchParentDocumentRetriever(
+        vectorstore=StubVectorStore(),
+        docstore=docstore,
+        child_splitter=CharacterTextSplitter(),
+        id_key="file_id",
+        chunks_index="file_chunks",
+        embeddings=StubEmbeddings.model_construct(),
+        **kwargs,
+    )
+    return retriever, docstore, captured
+
+
+def test_parent_retriever_batch(monkeypatch):
+    hits = {
+        "a": [chunk_hit("f1"), chunk_hit("f2"), chunk_hit("f1")],
+        "b": [chunk_hit("f2"), chunk_hit("missing")],
+    }
+    retriever, docstore, captured = make_parent_retriever(
+        monkeypatch, hits, search_kwargs={"k": 3, "filter": "mime = 'text'"}
+    )
+
+    results = retriever.batch(["a", "b"])
+
+    assert [[d.page_content for d in docs] for docs in results] == [
+        ["f1", "f2"],
+        ["f2"],
+    ]
+    assert docstore.calls == [["f1", "f2", "missing"]]
+    assert EMBED_CALLS == [["a", "b"]]
+    assert [q["q"] for q in captured["queries"]] == ["", ""]
+    assert "vector" in captured["queries"][1]
+    assert captured["queries"][0]["limit"] == 3
+    assert captured["queries"][0]["filter"] == "mime = 'text'"
+    assert results[0][1] is not results[1][0]
+
+
+def test_metadata_retriever_batch(monkeypatch):
+    import app.database as db_module
+
+    class DummyClient:
+        def multi_search(self, queries):
+            return {
+                "results": [
+                    {"hits": [{"content": q["q"], "id": q["q"]}]} for q in queries
+                ]
+            }
+
+    monkeypatch.setattr(db_module, "_client", DummyClient(), raising=False)
+    results = get_meta_retriever().batch(["x", "y"])
+
+    assert [docs[0].page_content for docs in results] == ["x", "y"]
+
+
+class StubReranker(CrossEncoderReranker):
+    def __init__(self):
+        super().__init__("stub")
+        self.calls = []
+
+    def score(self, pairs):
+        self.calls.append(list(pairs))
+        return [len(passage) for _, passage in pairs]
+
+
+def test_parent_retriever_rerank(monkeypatch):
+    retriever, docstore, _ = make_parent_retriever(
+        monkeypatch, {}, reranker=StubReranker(), rerank_fetch_k=5, rerank_top_k=2
+    )
+    retriever.vectorstore.chunks = [
+        Document(page_content=text, metadata={"file_id": file_id})
+        for file_id, text in [("f1", "a"), ("f2", "aaaa"), ("f3", "aa"), ("f4", "aaa")]
+    ]
+
+    docs = retriever.invoke("q")
+
+    assert retriever.vectorstore.k == 5
+    assert [d.page_content for d in docs] == ["f2", "f4"]
+    assert docstore.calls == [["f2", "f4"]]
+
+
+def test_parent_retriever_batch_rerank(monkeypatch):
+    hits = {
+        "a": [chunk_hit("f1", "a"), chunk_hit("f2", "aaa"), chunk_hit("f3", "aa")],
+        "b": [chunk_hit("f4", "aa"), chunk_hit("f1", "aaaa")],
+    }
+    reranker = StubReranker()
+    retriever, docstore, captured = make_parent_retriever(
+        monkeypatch, hits, reranker=reranker, rerank_fetch_k=7, rerank_top_k=2
+    )
+
+    results = retriever.batch(["a", "b"])
+
+    assert [[d.page_content for d in docs] for docs in results] == [
+        ["f2", "f3"],
+        ["f1", "f4"],
+    ]
+    assert len(reranker.calls) == 1
+    assert reranker.calls[0][1] == ("a", "aaa")
+    assert captured["queries"][0]["limit"] == 7
+    assert len(docstore.calls) == 1
+
+
+class ConstantReranker(StubReranker):
+    def score(self, pairs):
+        self.calls.append(list(pairs))
+        return [1.0] * len(pairs)
+
+
+def test_rerank_ties_match_between_invoke_and_batch(monkeypatch):
+    hits = {"q": [chunk_hit("f1", "x"), chunk_hit("f2", "y"), chunk_hit("f3", "z")]}
+    retriever, _, _ = make_parent_retriever(
+        monkeypatch, hits, reranker=ConstantReranker(), rerank_top_k=2
+    )
+    retriever.vectorstore.chunks = [
+        Document(page_content=h["metadata"]["text"], metadata=h["metadata"])
+        for h in hits["q"]
+    ]
+
+    single = [d.page_content for d in retriever.invoke("q")]
+    batched = [d.page_content for d in retriever.batch(["q"])[0]]
+
+    assert single == batched == ["f1", "f2"]
+
+
+def test_rerank_rejects_mmr(monkeypatch):
+    import pytest
+
+    with pytest.raises(ValueError):
+        make_parent_retriever(
+            monkeypatch, {}, reranker=StubReranker(), search_type="mmr"
+        )
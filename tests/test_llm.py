@@ -15,8 +15,7 @@ def test_load_llm_small_model():
 
 
 def test_load_llm_cached_default(monkeypatch):
-    monkeypatch.setattr(llm_module, "_cached_llm", None, raising=False)
-    monkeypatch.setattr(llm_module, "_cached_model_name", None, raising=False)
+    llm_module.registry.clear()
     monkeypatch.setattr(settings, "llm_model_name", "sshleifer/tiny-gpt2")
 
     llm1 = load_llm()
@@ -26,10 +25,180 @@ def test_load_llm_cached_default(monkeypatch):
 
 
 def test_load_llm_cached_same_model(monkeypatch):
-    monkeypatch.setattr(llm_module, "_cached_llm", None, raising=False)
-    monkeypatch.setattr(llm_module, "_cached_model_name", None, raising=False)
+    llm_module.registry.clear()
 
     llm1 = load_llm("sshleifer/tiny-gpt2")
     llm2 = load_llm("sshleifer/tiny-gpt2")
 
     assert llm1 is llm2
+
+
+def test_load_llm_cache_keyed_by_speculative(monkeypatch):
+    llm_module.registry.clear()
+
+    llm1 = load_llm("sshleifer/tiny-gpt2", speculative="none")
+    llm2 = load_llm("sshleifer/tiny-gpt2", speculative="prompt_lookup")
+
+    assert llm1 is not llm2
+
+
+def test_load_llm_unknown_speculative():
+    import pytest
+
+    with pytest.raises(ValueError):
+        load_llm("sshleifer/tiny-gpt2", speculative="bogus")
+
+
+def test_generate_kwargs_prompt_lookup(monkeypatch):
+    monkeypatch.setattr(settings, "draft_num_pred_tokens", 7)
+    kwargs = llm_module._generate_kwargs("prompt_lookup")
+    assert kwargs == {"prompt_lookup_num_tokens": 7}
+
+
+def test_tokens_per_second(monkeypatch):
+    from app.bench import tokens_per_second
+
+    llm = load_llm("sshleifer/tiny-gpt2")
+    monkeypatch.setattr(type(llm), "get_num_tokens", lambda self, text: 1)
+    assert tokens_per_second(llm, "Hello", runs=2) > 0
+
+
+def test_count_tokens_uses_model_tokenizer():
+    from app.bench import count_tokens
+
+    class DummyTokenizer:
+        def encode(self, text, add_special_tokens=True):
+            return text.split()
+
+    class DummyPipeline:
+        tokenizer = DummyTokenizer()
+
+    class DummyLLM:
+        pipeline = DummyPipeline()
+
+    assert count_tokens(DummyLLM(), "one two three") == 3
+
+
+def test_model_size_includes_kv_cache(monkeypatch, tmp_path):
+    model_path = tmp_path / "model.gguf"
+    model_path.write_bytes(b"\0" * 2**20)
+    monkeypatch.setattr(settings, "llama_n_ctx", 1024)
+    monkeypatch.setattr(
+        llm_module, "kv_cache_mb", lambda path, n_ctx, kv_type, meta=None: n_ctx / 512
+    )
+
+    size = llm_module._model_size_mb((str(model_path), "none"), None)
+
+    assert size == 3.0
+
+
+def test_tokens_per_second_skips_prompt():
+    from app.bench import tokens_per_second
+
+    class DummyTokenizer:
+        def encode(self, text, add_special_tokens=True):
+            return text.split()
+
+    class DummyPipeline:
+        tokenizer = DummyTokenizer()
+
+    class DummyLLM:
+        pipeline = DummyPipeline()
+
+        def __init__(self):
+            self.kwargs = []
+
+        def invoke(self, prompt, **kwargs):
+            self.kwargs.append(kwargs)
+            return prompt + " one two"
+
+    llm = DummyLLM()
+    tps = tokens_per_second(llm, "a long prompt here", runs=1)
+
+    assert tps > 0
+    assert llm.kwargs[-1] == {"skip_prompt": True}
+
+
+def _stub_speculative(monkeypatch):
+    import types
+
+    class PromptLookup:
+        def __init__(self, num_pred_tokens):
+            self.num_pred_tokens = num_pred_tokens
+
+    speculative = types.ModuleType("llama_cpp.llama_speculative")
+    speculative.LlamaPromptLookupDecoding = PromptLookup
+    monkeypatch.setitem(sys.modules, "llama_cpp", types.ModuleType("llama_cpp"))
+    monkeypatch.setitem(sys.modules, "llama_cpp.llama_speculative", speculative)
+    return PromptLookup
+
+
+def test_build_gguf_prompt_lookup(monkeypatch):
+    prompt_lookup = _stub_speculative(monkeypatch)
+    monkeypatch.setattr(settings, "llama_auto_tune", False)
+    monkeypatch.setattr(settings, "llama_kv_cache_type", "f16")
+    monkeypatch.setattr(settings, "draft_num_pred_tokens", 5)
+    captured = {}
+    monkeypatch.setattr(llm_module, "ChatLlamaCpp", lambda **kw: captured.update(kw))
+
+    llm_module._build_llm(("model.gguf", "prompt_lookup"))
+
+    draft = captured["model_kwargs"]["draft_model"]
+    assert isinstance(draft, prompt_lookup)
+    assert draft.num_pred_tokens == 5
+
+
+def test_build_gguf_rejects_draft_model(monkeypatch):
+    import pytest
+
+    _stub_speculative(monkeypatch)
+    monkeypatch.setattr(settings, "llama_auto_tune", False)
+    monkeypatch.setattr(settings, "llama_kv_cache_type", "f16")
+    monkeypatch.setattr(llm_module, "ChatLlamaCpp", lambda **kw: None)
+
+    with pytest.raises(ValueError):
+        llm_module._build_llm(("model.gguf", "draft_model"))
+
+
+def test_build_transformers_assisted_generation(monkeypatch):
+    loaded = []
+    captured = {}
+
+    class DummyAutoModel:
+        @staticmethod
+        def from_pretrained(name, **kwargs):
+            loaded.append(name)
+            return f"model:{name}"
+
+    class DummyAutoTokenizer:
+        @staticmethod
+        def from_pretrained(name, **kwargs):
+            return "tokenizer"
+
+    def dummy_pipeline(task, **kwargs):
+        captured.update(kwargs)
+        return "pipeline"
+
+    monkeypatch.setattr(settings, "draft_model_name", "draft")
+    monkeypatch.setattr(llm_module, "AutoModelForCausalLM", DummyAutoModel)
+    monkeypatch.setattr(llm_module, "AutoTokenizer", DummyAutoTokenizer)
+    monkeypatch.setattr(llm_module, "pipeline", dummy_pipeline)
+    monkeypatch.setattr(llm_module, "HuggingFacePipeline", lambda pipeline: pipeline)
+
+    llm_module._build_llm(("target", "draft_model"))
+
+    assert loaded == ["target", "draft"]
+    assert captured["assistant_model"] == "model:draft"
+
+
+def test_model_size_from_local_checkpoint(tmp_path):
+    import json
+
+    header = json.dumps(
+        {"__metadata__": {}, "w": {"dtype": "BF16", "shape": [512, 1024], "data_offsets": [0, 0]}}
+    ).encode()
+    (tmp_path / "model.safetensors").write_bytes(len(header).to_bytes(8, "little") + header)
+
+    size = llm_module._model_size_mb((str(tmp_path), "none"), None)
+
+    assert size == 2.0
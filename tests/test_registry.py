@@ -0,0 +1,96 @@
+from pathlib import Path
+import sys
+
+sys.path.insert(0, str(Path(__file__).resolve().parents[1]))
+
+from app.registry import ModelRegistry
+
+
+class DummyModel:
+    def __init__(self, name):
+        self.name = name
+
+
+SIZES = {"small": 1.0, "large": 3.0, "medium": 2.0}
+
+
+def make_registry(budget):
+    loads = []
+
+    def loader(key):
+        loads.append(key)
+        return DummyModel(key)
+
+    def sizer(key, model):
+        return SIZES[key] if model is not None else 0.0
+
+    return ModelRegistry(loader, sizer, budget), loads
+
+
+def test_registry_caches_models():
+    registry, loads = make_registry(10)
+    assert registry.get("small") is registry.get("small")
+    assert loads == ["small"]
+
+
+def test_registry_holds_several_models():
+    registry, _ = make_registry(10)
+    registry.get("small")
+    registry.get("large")
+    assert registry.resident() == {"small": 1.0, "large": 3.0}
+    assert registry.resident_mb() == 4.0
+
+
+def test_registry_evicts_least_recently_used():
+    registry, loads = make_registry(5)
+    registry.get("small")
+    registry.get("large")
+    registry.get("small")
+    registry.get("medium")
+
+    assert list(registry.resident()) == ["small", "medium"]
+    registry.get("large")
+    assert loads.count("large") == 2
+
+
+def test_registry_load_async():
+    registry, _ = make_registry(10)
+    future = registry.load_async("small")
+    assert future.result().name == "small"
+    assert registry.load_async("small").result() is future.result()
+
+
+def test_registry_evicts_before_loading_known_size():
+    resident_at_load = []
+    registry = None
+
+    def loader(key):
+        resident_at_load.append(dict(registry.resident()))
+        return DummyModel(key)
+
+    registry = ModelRegistry(loader, lambda key, model: SIZES[key], 5)
+    registry.get("small")
+    registry.get("large")
+    registry.get("medium")
+
+    # "small" and "large" would exceed the budget alongside "medium", so the
+    # least recently used one goes before "medium" is materialised.
+    assert resident_at_load[-1] == {"large": 3.0}
+
+
+def test_registry_evicts_all_before_loading_unknown_size():
+    resident_at_load = []
+    registry = None
+
+    def loader(key):
+        resident_at_load.append(dict(registry.resident()))
+        return DummyModel(key)
+
+    def sizer(key, model):
+        return SIZES[key] if model is not None else None
+
+    registry = ModelRegistry(loader, sizer, 10)
+    registry.get("small")
+    registry.get("large")
+
+    assert resident_at_load[-1] == {}
@@ -0,0 +1,60 @@
+from pathlib import Path
+import sys
+
+sys.path.insert(0, str(Path(__file__).resolve().parents[1]))
+
+from app import rerank as rerank_module
+from app.config import settings
+from app.rerank import CrossEncoderReranker, get_reranker
+
+
+class DummyModel:
+    def __init__(self):
+        self.calls = []
+
+    def predict(self, pairs, batch_size=32, show_progress_bar=False):
+        self.calls.append(pairs)
+        return [len(passage) for _, passage in pairs]
+
+
+def test_rank_orders_by_score():
+    reranker = CrossEncoderReranker("dummy")
+    model = DummyModel()
+    reranker._model = model
+
+    order = reranker.rank("q", ["aa", "a", "aaa"])
+
+    assert order == [2, 0, 1]
+    assert len(model.calls) == 1
+
+
+def test_get_reranker_disabled(monkeypatch):
+    monkeypatch.setattr(settings, "rerank_model_name", None)
+    assert get_reranker() is None
+
+
+def test_get_reranker_cached(monkeypatch):
+    monkeypatch.setattr(rerank_module, "_reranker", None, raising=False)
+    monkeypatch.setattr(settings, "rerank_model_name", "dummy")
+
+    assert get_reranker() is get_reranker()
+
+
+def test_get_reranker_rebuilt_on_settings_change(monkeypatch):
+    monkeypatch.setattr(rerank_module, "_reranker", None, raising=False)
+    monkeypatch.setattr(settings, "rerank_model_name", "dummy")
+    monkeypatch.setattr(settings, "rerank_batch_size", 8)
+    first = get_reranker()
+
+    monkeypatch.setattr(settings, "rerank_batch_size", 16)
+    second = get_reranker()
+
+    assert second is not first
+    assert second.batch_size == 16
+
+
+def test_unknown_backend_rejected():
+    import pytest
+
+    with pytest.raises(ValueError):
+        CrossEncoderReranker("dummy", backend="tensorrt")
@@ -0,0 +1,168 @@
+from pathlib import Path
+import sys
+
+sys.path.insert(0, str(Path(__file__).resolve().parents[1]))
+
+import pytest
+
+from app.config import settings
+from app.tuning import detect_physical_cores, kv_cache_mb_per_token, llama_cpp_params
+
+
+def test_detect_physical_cores():
+    assert detect_physical_cores() >= 1
+
+
+def test_kv_cache_mb_per_token():
+    meta = {
+        "general.architecture": "llama",
+        "llama.block_count": "32",
+        "llama.embedding_length": "4096",
+        "llama.attention.head_count": "32",
+        "llama.attention.head_count_kv": "8",
+    }
+    assert kv_cache_mb_per_token(meta, "f16") == pytest.approx(0.125)
+
+
+def test_llama_cpp_params_from_settings(monkeypatch):
+    monkeypatch.setattr(settings, "llama_auto_tune", False)
+    monkeypatch.setattr(settings, "llama_n_threads", 6)
+    monkeypatch.setattr(settings, "llama_n_batch", 256)
+    monkeypatch.setattr(settings, "llama_n_ctx", 4096)
+    monkeypatch.setattr(settings, "llama_kv_cache_type", "f16")
+
+    params = llama_cpp_params("model.gguf")
+
+    assert params["n_threads"] == 6
+    assert params["n_batch"] == 256
+    assert params["n_ctx"] == 4096
+    assert params["f16_kv"] is True
+    assert params["model_kwargs"] == {"n_threads_batch": 6}
+
+
+def test_llama_cpp_params_quantised_kv(monkeypatch):
+    monkeypatch.setattr(settings, "llama_auto_tune", False)
+    monkeypatch.setattr(settings, "llama_kv_cache_type", "q8_0")
+
+    params = llama_cpp_params("model.gguf")
+
+    assert params["model_kwargs"]["type_k"] == params["model_kwargs"]["type_v"]
+    assert params["model_kwargs"]["flash_attn"] is True
+
+
+def test_llama_cpp_params_auto_threads(monkeypatch):
+    import app.tuning as tuning_module
+
+    monkeypatch.setattr(settings, "llama_auto_tune", True)
+    monkeypatch.setattr(settings, "llama_calibrate", False)
+    monkeypatch.setattr(settings, "llama_n_threads", None)
+    monkeypatch.setattr(tuning_module, "detect_physical_cores", lambda: 3)
+    monkeypatch.setattr(tuning_module, "_fit_context", lambda path, n_ctx, kv: 2048)
+
+    params = llama_cpp_params("model.gguf")
+
+    assert params["n_threads"] == 3
+    assert params["n_ctx"] == 2048
+
+
+def test_llama_cpp_params_unknown_kv(monkeypatch):
+    monkeypatch.setattr(settings, "llama_kv_cache_type", "bogus")
+    with pytest.raises(ValueError):
+        llama_cpp_params("model.gguf")
+
+
+def test_calibrate_keeps_explicit_settings(monkeypatch):
+    import app.tuning as tuning_module
+
+    captured = {}
+
+    def dummy_calibrate(path, thread_options=None, batch_thread_options=None, batch_options=()):
+        captured["threads"] = thread_options
+        captured["batch_threads"] = batch_thread_options
+        captured["batches"] = batch_options
+        return 6, 4, 128
+
+    monkeypatch.setattr(settings, "llama_auto_tune", True)
+    monkeypatch.setattr(settings, "llama_calibrate", True)
+    monkeypatch.setattr(settings, "llama_n_threads", 6)
+    monkeypatch.setattr(settings, "llama_n_threads_batch", None)
+    monkeypatch.setattr(settings, "llama_n_batch", None)
+    monkeypatch.setattr(settings, "llama_kv_cache_type", "f16")
+    monkeypatch.setattr(tuning_module, "_fit_context", lambda path, n_ctx, kv: n_ctx)
+    monkeypatch.setattr(tuning_module, "calibrate", dummy_calibrate)
+
+    params = llama_cpp_params("model.gguf")
+
+    assert captured["threads"] == [6]
+    assert captured["batch_threads"] is None
+    assert params["n_batch"] == 128
+    assert params["model_kwargs"]["n_threads_batch"] == 4
+
+
+def test_n_threads_batch_follows_n_threads(monkeypatch):
+    monkeypatch.setattr(settings, "llama_auto_tune", False)
+    monkeypatch.setattr(settings, "llama_n_threads", 5)
+    monkeypatch.setattr(settings, "llama_n_threads_batch", None)
+    monkeypatch.setattr(settings, "llama_kv_cache_type", "f16")
+
+    params = llama_cpp_params("model.gguf")
+
+    assert params["model_kwargs"]["n_threads_batch"] == 5
+
+
+def test_detect_physical_cores_capped_by_cgroup(monkeypatch):
+    import app.tuning as tuning_module
+
+    monkeypatch.setattr(tuning_module, "_cgroup_cpu_limit", lambda: 1)
+    assert detect_physical_cores() == 1
+
+
+class DummyLlama:
+    instances = []
+
+    def __init__(self, model_path, vocab_only=False, n_threads=None,
+                 n_threads_batch=None, n_batch=None, **kwargs):
+        self.n_threads = n_threads
+        self.n_threads_batch = n_threads_batch
+        self.n_batch = n_batch
+        if not vocab_only:
+            DummyLlama.instances.append(self)
+
+    def tokenize(self, text):
+        return text.split()
+
+
+def test_calibration_prompt_exceeds_largest_batch():
+    from app.tuning import calibration_prompt
+
+    prompt = calibration_prompt(lambda text: text.split(), 512)
+
+    assert len(prompt.split()) > 512
+    assert prompt.startswith("Context:")
+
+
+def test_calibrate_judges_each_phase(monkeypatch):
+    import types
+    import app.tuning as tuning_module
+
+    evaluated = []
+
+    def fake_time_phases(llm, tokens, max_tokens):
+        evaluated.append(len(tokens))
+        prompt_s = 1 / llm.n_threads_batch + (0 if llm.n_batch == 256 else 1)
+        gen_s = abs(llm.n_threads - 6)
+        return prompt_s, gen_s
+
+    fake_llama_cpp = types.ModuleType("llama_cpp")
+    fake_llama_cpp.Llama = DummyLlama
+    DummyLlama.instances = []
+    monkeypatch.setitem(sys.modules, "llama_cpp", fake_llama_cpp)
+    monkeypatch.setattr(tuning_module, "_time_phases", fake_time_phases)
+    monkeypatch.setattr(tuning_module, "detect_physical_cores", lambda: 8)
+    monkeypatch.setattr(tuning_module, "_calibrated", {})
+
+    result = tuning_module.calibrate("model.gguf")
+
+    assert result == (6, 8, 256)
+    assert max(llm.n_threads for llm in DummyLlama.instances) == 8
+    assert max(evaluated) > 512